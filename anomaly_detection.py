@@ -2,52 +2,64 @@ import pandas as pd
 import numpy as np
 from typing import Dict, List, Any
 from datetime import datetime
+import numbers
+import warnings
 
 class AnomalyDetector:
     """Détecteur d'anomalies pour les données financières"""
     
-    def __init__(self, std_threshold: float = 3.0):
+    def __init__(self, std_threshold: float = 3.0, max_reported: int = 1000):
         self.std_threshold = std_threshold
+        self.max_reported = max_reported  # Nb max de valeurs listées par colonne
     
     def detect_statistical_outliers(self, df: pd.DataFrame, 
                                   numeric_columns: List[str]) -> Dict[str, Any]:
         """Détecte les valeurs aberrantes statistiques (méthode Z-score)"""
         outliers = {}
         
-        for column in numeric_columns:
-            if column in df.columns and df[column].dtype in ['float64', 'int64']:
-                values = df[column].dropna()
-                
-                if len(values) > 0:
-                    try:
-                        # Calcul Z-score
-                        mean_val = values.mean()
-                        std_val = values.std()
-                        
-                        if std_val > 0:
-                            z_scores = np.abs((values - mean_val) / std_val)
-                            outlier_indices = np.where(z_scores > self.std_threshold)[0]
-                            
-                            outliers[column] = {
-                                'count': len(outlier_indices),
-                                'percentage': len(outlier_indices) / len(values) * 100,
-                                'outlier_values': values.iloc[outlier_indices].tolist(),
-                                'z_scores': z_scores[outlier_indices].tolist()
-                            }
-                        else:
-                            outliers[column] = {
-                                'count': 0,
-                                'percentage': 0.0,
-                                'outlier_values': [],
-                                'z_scores': []
-                            }
-                    except Exception:
-                        outliers[column] = {
-                            'count': 0,
-                            'percentage': 0.0,
-                            'outlier_values': [],
-                            'z_scores': []
-                        }
+        columns = [
+            column for column in numeric_columns
+            if column in df.columns and df[column].dtype in ['float64', 'int64']
+        ]
+        if not columns:
+            return outliers
+        
+        # Une seule matrice float64 pour toutes les colonnes
+        arr = df[columns].to_numpy(dtype=np.float64, copy=False)
+        valid_counts = np.count_nonzero(~np.isnan(arr), axis=0)
+        
+        with warnings.catch_warnings():
+            # Colonnes vides ou à une seule valeur: moyenne/écart-type NaN
+            warnings.simplefilter('ignore', RuntimeWarning)
+            mean_vals = np.nanmean(arr, axis=0)
+            std_vals = np.nanstd(arr, axis=0, ddof=1)
+        
+        # Z-scores calculés en place dans un seul tampon (pas de temporaires
+        # intermédiaires pour la division et la valeur absolue)
+        z_scores = arr - mean_vals
+        with np.errstate(invalid='ignore'):
+            z_scores /= np.where(std_vals > 0, std_vals, np.nan)
+            np.abs(z_scores, out=z_scores)
+            mask = z_scores > self.std_threshold
+        
+        # Indices (colonne, ligne) triés par colonne puis par ligne
+        col_idx, row_idx = np.nonzero(mask.T)
+        bounds = np.searchsorted(col_idx, np.arange(1, len(columns)))
+        rows_by_column = np.split(row_idx, bounds)
+        
+        for j, column in enumerate(columns):
+            if valid_counts[j] == 0:
+                continue
+            
+            rows = rows_by_column[j]
+            reported = rows[:self.max_reported]
+            outliers[column] = {
+                'count': len(rows),
+                'percentage': len(rows) / int(valid_counts[j]) * 100,
+                'outlier_values': arr[reported, j].tolist(),
+                'z_scores': z_scores[reported, j].tolist(),
+                'truncated': len(rows) > len(reported)
+            }
         
         return outliers
     
@@ -59,41 +71,67 @@ class AnomalyDetector:
             return {'gaps': [], 'sudden_changes': []}
         
         try:
-            # Trier par date
-            df_sorted = df.sort_values(date_column)
-            df_sorted[date_column] = pd.to_datetime(df_sorted[date_column])
+            dates = pd.to_datetime(df[date_column], errors='coerce', cache=True)
+            values = None
+            if value_column in df.columns:
+                values = df[value_column].to_numpy(dtype=np.float64, na_value=np.nan)
+            
+            # Trier par date, sauf si la série est déjà triée (cas des collecteurs)
+            is_sorted = dates.is_monotonic_increasing
+            dates = dates.to_numpy(dtype='datetime64[ns]')
+            if not is_sorted:
+                order = np.argsort(dates, kind='stable')
+                dates = dates[order]
+                if values is not None:
+                    values = values[order]
             
             # Détection des gaps temporels
             gaps = []
-            if len(df_sorted) > 1:
-                time_diffs = df_sorted[date_column].diff()
-                median_diff = time_diffs.median()
+            valid_dates = dates[~np.isnat(dates)]  # NaT triés en fin de série
+            if len(valid_dates) > 1:
+                time_diffs = np.diff(valid_dates.view('i8'))
+                median_diff = np.median(time_diffs)
+                gap_indices = np.nonzero(time_diffs > median_diff * 3)[0] + 1  # Gap > 3x médiane
                 
-                for i, diff in enumerate(time_diffs):
-                    if pd.notna(diff) and diff > median_diff * 3:  # Gap > 3x médiane
-                        gaps.append({
-                            'index': i,
-                            'gap_duration': str(diff),
-                            'date_before': df_sorted.iloc[i-1][date_column].isoformat(),
-                            'date_after': df_sorted.iloc[i][date_column].isoformat()
-                        })
+                gaps = [
+                    {
+                        'index': int(i),
+                        'gap_duration': str(pd.Timedelta(int(time_diffs[i-1]))),
+                        'date_before': pd.Timestamp(valid_dates[i-1]).isoformat(),
+                        'date_after': pd.Timestamp(valid_dates[i]).isoformat()
+                    }
+                    for i in gap_indices
+                ]
             
             # Détection des variations brutales
             sudden_changes = []
-            if value_column in df_sorted.columns:
-                values = df_sorted[value_column].dropna()
+            if values is not None:
+                values = values[~np.isnan(values)]
                 if len(values) > 1:
-                    pct_changes = values.pct_change().abs()
-                    threshold = pct_changes.quantile(0.95)  # Top 5% des variations
-                    
-                    extreme_changes = pct_changes[pct_changes > threshold]
-                    for idx, change in extreme_changes.items():
-                        sudden_changes.append({
-                            'index': int(idx),
-                            'percentage_change': float(change * 100),
-                            'value_before': float(values.iloc[idx-1]) if idx > 0 else None,
-                            'value_after': float(values.iloc[idx])
-                        })
+                    with np.errstate(divide='ignore', invalid='ignore'):
+                        pct_changes = np.abs(np.diff(values)) / np.abs(values[:-1])
+                        
+                        valid_changes = pct_changes[~np.isnan(pct_changes)]
+                        if valid_changes.size > 0:
+                            # Top 5% des variations: quantile 95% (interpolation
+                            # linéaire) par sélection O(n) au lieu d'un tri; une
+                            # valeur nulle donne des variations infinies (inf - inf)
+                            position = 0.95 * (valid_changes.size - 1)
+                            k = int(position)
+                            k_next = min(k + 1, valid_changes.size - 1)
+                            partitioned = np.partition(valid_changes, [k, k_next])
+                            threshold = partitioned[k] + (position - k) * (partitioned[k_next] - partitioned[k])
+                            
+                            idx = np.nonzero(pct_changes > threshold)[0] + 1
+                            for i, change, before, after in zip(
+                                idx, pct_changes[idx - 1], values[idx - 1], values[idx]
+                            ):
+                                sudden_changes.append({
+                                    'index': int(i),
+                                    'percentage_change': float(change * 100),
+                                    'value_before': float(before),
+                                    'value_after': float(after)
+                                })
             
             return {
                 'gaps': gaps,
@@ -107,46 +145,94 @@ class AnomalyDetector:
                                        rules: Dict[str, Any]) -> Dict[str, Any]:
         """Détecte les violations de règles métier"""
         violations = {}
+        total = len(df)
+        
+        # Regroupement des règles par type pour une évaluation vectorisée
+        range_names, range_arrays, lows, highs = [], [], [], []
+        null_names, null_columns = [], []
         
         for rule_name, rule_config in rules.items():
-            try:
-                column = rule_config.get('column')
-                rule_type = rule_config.get('type')
+            column = rule_config.get('column')
+            rule_type = rule_config.get('type')
+            
+            if column not in df.columns:
+                continue
+            
+            if rule_type == 'range':
+                min_val = rule_config.get('min')
+                max_val = rule_config.get('max')
                 
-                if column not in df.columns:
+                if min_val is None or max_val is None:
+                    violations[rule_name] = {
+                        'type': 'range_violation',
+                        'count': 0,
+                        'percentage': 0.0
+                    }
+                    continue
+                
+                # Matrice commune réservée aux colonnes numériques à bornes réelles;
+                # les autres règles (dates, bornes invalides) sont évaluées seules
+                if (pd.api.types.is_numeric_dtype(df[column])
+                        and isinstance(min_val, numbers.Real) and isinstance(max_val, numbers.Real)):
+                    range_names.append(rule_name)
+                    range_arrays.append(df[column].to_numpy(dtype=np.float64, na_value=np.nan))
+                    lows.append(min_val)
+                    highs.append(max_val)
                     continue
                 
-                if rule_type == 'range':
-                    min_val = rule_config.get('min')
-                    max_val = rule_config.get('max')
-                    
-                    violations_mask = (
-                        (df[column] < min_val) | (df[column] > max_val)
-                    ) if min_val is not None and max_val is not None else False
-                    
-                    violation_count = violations_mask.sum() if hasattr(violations_mask, 'sum') else 0
-                    
+                try:
+                    violation_count = ((df[column] < min_val) | (df[column] > max_val)).sum()
                     violations[rule_name] = {
                         'type': 'range_violation',
                         'count': int(violation_count),
-                        'percentage': float(violation_count / len(df) * 100) if len(df) > 0 else 0
+                        'percentage': float(violation_count / total * 100) if total > 0 else 0
                     }
-                
-                elif rule_type == 'not_null':
-                    null_count = df[column].isnull().sum()
+                except Exception as e:
                     violations[rule_name] = {
-                        'type': 'null_violation',
-                        'count': int(null_count),
-                        'percentage': float(null_count / len(df) * 100) if len(df) > 0 else 0
+                        'type': 'error',
+                        'error': str(e)
                     }
-                    
-            except Exception as e:
+            
+            elif rule_type == 'not_null':
+                null_names.append(rule_name)
+                null_columns.append(column)
+        
+        # Toutes les règles de plage en une seule expression sur une matrice 2D
+        if range_names:
+            values = np.column_stack(range_arrays)
+            with np.errstate(invalid='ignore'):
+                mask = (values < np.array(lows, dtype=np.float64)) | (values > np.array(highs, dtype=np.float64))
+            
+            for rule_name, violation_count in zip(range_names, mask.sum(axis=0)):
                 violations[rule_name] = {
-                    'type': 'error',
-                    'error': str(e)
+                    'type': 'range_violation',
+                    'count': int(violation_count),
+                    'percentage': float(violation_count / total * 100) if total > 0 else 0
                 }
         
-        return violations
+        if null_names:
+            null_counts = df[null_columns].isnull().to_numpy().sum(axis=0)
+            
+            for rule_name, null_count in zip(null_names, null_counts):
+                violations[rule_name] = {
+                    'type': 'null_violation',
+                    'count': int(null_count),
+                    'percentage': float(null_count / total * 100) if total > 0 else 0
+                }
+        
+        # Conserver l'ordre de déclaration des règles
+        return {rule_name: violations[rule_name] for rule_name in rules if rule_name in violations}
+    
+    def _analyze_source(self, df: pd.DataFrame, business_rules: Dict[str, Any]) -> Dict[str, Any]:
+        """Analyse complète d'une source"""
+        # Colonnes numériques pour détection statistique
+        numeric_columns = df.select_dtypes(include=[np.number]).columns.tolist()
+        
+        return {
+            'statistical_outliers': self.detect_statistical_outliers(df, numeric_columns),
+            'temporal_anomalies': self.detect_temporal_anomalies(df),
+            'business_rule_violations': self.detect_business_rule_violations(df, business_rules)
+        }
     
     def generate_anomaly_report(self, data_dict: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
         """Génère un rapport d'anomalies complet"""
@@ -174,15 +260,6 @@ class AnomalyDetector:
             if df.empty:
                 continue
             
-            # Colonnes numériques pour détection statistique
-            numeric_columns = df.select_dtypes(include=[np.number]).columns.tolist()
-            
-            source_report = {
-                'statistical_outliers': self.detect_statistical_outliers(df, numeric_columns),
-                'temporal_anomalies': self.detect_temporal_anomalies(df),
-                'business_rule_violations': self.detect_business_rule_violations(df, business_rules)
-            }
-            
-            report['sources'][source_name] = source_report
+            report['sources'][source_name] = self._analyze_source(df, business_rules)
         
-        return report
\ No newline at end of file
+        return report
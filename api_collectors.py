@@ -1,18 +1,34 @@
 import yfinance as yf
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
-import json
+import numpy as np
+from pyarrow import csv as pacsv
+import orjson
 from datetime import datetime, timedelta
 import os
 from typing import Dict, Optional, List
-import time
 import logging
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Colonnes texte à faible cardinalité, stockées en catégories
+CATEGORICAL_COLUMNS = ('source', 'rate_type', 'instrument', 'ticker')
+
+# Tickers Yahoo Finance collectés et nom d'instrument associé
+MARKET_TICKERS = {
+    '^TNX': 'US_10Y_Treasury',
+    '^IRX': 'US_3M_Treasury', 
+    '^FVX': 'US_5Y_Treasury',
+    'EURUSD=X': 'EUR_USD_Rate',
+    'BTC-USD': 'Bitcoin_USD'
+}
+
 class LiquidityDataCollector:
     """
     Collecteur de données de liquidité pour le monitoring qualité
@@ -21,8 +37,18 @@ class LiquidityDataCollector:
     
     def __init__(self, data_path: str = "./data/raw"):
         self.data_path = data_path
+        self._fmt = 'parquet'
         self.ensure_data_directory()
         
+        # Session HTTP partagée (réutilisation des connexions TCP/TLS)
+        self._session = requests.Session()
+        self._session.headers.update({'User-Agent': 'liquidity_monitor/1.0'})
+        self._session.mount('https://', HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=8,
+            max_retries=Retry(total=3, backoff_factor=0.3)
+        ))
+        
     def ensure_data_directory(self):
         """Crée les dossiers de données si nécessaire"""
         directories = [
@@ -35,42 +61,79 @@ class LiquidityDataCollector:
         for directory in directories:
             Path(directory).mkdir(parents=True, exist_ok=True)
     
+    def _to_categorical(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Convertit les colonnes texte répétitives en dtype 'category'"""
+        for column in CATEGORICAL_COLUMNS:
+            if column in df.columns:
+                df[column] = df[column].astype('category')
+        return df
+    
+    def _save_dataframe(self, df: pd.DataFrame, source_dir: str, prefix: str,
+                        collection_time: datetime) -> str:
+        """Sauvegarde un DataFrame collecté (Parquet compressé zstd)"""
+        filename = f"{prefix}_{collection_time.strftime('%Y%m%d_%H%M%S')}.{self._fmt}"
+        filepath = os.path.join(self.data_path, source_dir, filename)
+        
+        if self._fmt == 'parquet':
+            df.to_parquet(filepath, compression='zstd', index=False, engine='pyarrow')
+        else:
+            df.to_csv(filepath, index=False)
+        
+        return filepath
+    
+    def load_file(self, filepath: str) -> pd.DataFrame:
+        """Charge un fichier de données collectées (Parquet, ou CSV historique)"""
+        if filepath.endswith('.parquet'):
+            return pd.read_parquet(filepath, engine='pyarrow')
+        
+        # Lecteur CSV pyarrow (multi-thread, dates typées à la lecture)
+        table = pacsv.read_csv(
+            filepath,
+            read_options=pacsv.ReadOptions(use_threads=True),
+            convert_options=pacsv.ConvertOptions(strings_can_be_null=True)
+        )
+        return self._to_categorical(table.to_pandas(date_as_object=False))
+    
     def collect_ecb_rates(self) -> pd.DataFrame:
         """Collecte les taux de la BCE (EURIBOR)"""
+        collection_time = datetime.now()
+        
         try:
             url = "https://sdw-wsrest.ecb.europa.eu/service/data/FM/D.U2.EUR.RT.MM.EURIBOR1MD_.HSTA"
             headers = {'Accept': 'application/vnd.sdmx.data+json;version=1.0.0'}
             
             logger.info("🔄 Collecte des taux BCE...")
-            response = requests.get(url, headers=headers, timeout=30)
+            response = self._session.get(url, headers=headers, timeout=30)
             
             if response.status_code == 200:
-                data = response.json()
+                data = orjson.loads(response.content)
                 
-                # Extraction des données SDMX
+                # Extraction des données SDMX (construction colonne par colonne)
                 observations = data['data']['dataSets'][0]['observations']
                 dates = data['data']['structure']['dimensions']['observation'][0]['values']
                 
-                records = []
-                for obs_key, obs_data in observations.items():
-                    date_idx = int(obs_key.split(':')[0])
-                    date_str = dates[date_idx]['id']
-                    value = obs_data[0] if obs_data[0] is not None else None
-                    
-                    records.append({
-                        'date': pd.to_datetime(date_str),
-                        'rate_type': 'EURIBOR_1M',
-                        'value': value,
-                        'source': 'ECB',
-                        'collection_time': datetime.now()
-                    })
+                date_ids = np.array([date['id'] for date in dates])
+                date_indices = np.fromiter(
+                    (int(obs_key.split(':', 1)[0]) for obs_key in observations),
+                    dtype=np.int64, count=len(observations)
+                )
+                values = np.fromiter(
+                    (obs_data[0] if obs_data[0] is not None else np.nan for obs_data in observations.values()),
+                    dtype=np.float64, count=len(observations)
+                )
+                
+                df = pd.DataFrame({
+                    'date': pd.to_datetime(date_ids[date_indices]),
+                    'rate_type': 'EURIBOR_1M',
+                    'value': values,
+                    'source': 'ECB',
+                    'collection_time': collection_time
+                })
                 
-                df = pd.DataFrame(records)
+                df = self._to_categorical(df)
                 
                 # Sauvegarde
-                filename = f"ecb_rates_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-                filepath = os.path.join(self.data_path, "ecb", filename)
-                df.to_csv(filepath, index=False)
+                self._save_dataframe(df, "ecb", "ecb_rates", collection_time)
                 
                 logger.info(f"✅ BCE: {len(df)} enregistrements collectés")
                 return df
@@ -85,50 +148,40 @@ class LiquidityDataCollector:
     
     def collect_market_data(self) -> pd.DataFrame:
         """Collecte données de marché via Yahoo Finance"""
+        collection_time = datetime.now()
+        
         try:
-            tickers = {
-                '^TNX': 'US_10Y_Treasury',
-                '^IRX': 'US_3M_Treasury', 
-                '^FVX': 'US_5Y_Treasury',
-                'EURUSD=X': 'EUR_USD_Rate',
-                'BTC-USD': 'Bitcoin_USD'
-            }
+            tickers = MARKET_TICKERS
             
-            all_data = []
+            frames = []
             logger.info("🔄 Collecte des données de marché...")
             
+            # Téléchargement groupé (requêtes parallélisées par yfinance)
+            hist = yf.download(
+                tickers=" ".join(tickers),
+                period="30d",
+                group_by='ticker',
+                threads=True,
+                auto_adjust=True,
+                progress=False
+            )
+            
             for ticker, name in tickers.items():
                 try:
-                    stock = yf.Ticker(ticker)
-                    hist = stock.history(period="30d")
+                    ticker_hist = hist[ticker].dropna(how='all')
                     
-                    if not hist.empty:
-                        for date, row in hist.iterrows():
-                            all_data.append({
-                                'date': date.date(),
-                                'instrument': name,
-                                'ticker': ticker,
-                                'open': float(row['Open']) if pd.notna(row['Open']) else None,
-                                'high': float(row['High']) if pd.notna(row['High']) else None,
-                                'low': float(row['Low']) if pd.notna(row['Low']) else None,
-                                'close': float(row['Close']) if pd.notna(row['Close']) else None,
-                                'volume': int(row['Volume']) if 'Volume' in row and pd.notna(row['Volume']) else None,
-                                'source': 'Yahoo_Finance',
-                                'collection_time': datetime.now()
-                            })
-                    
-                    time.sleep(0.5)  # Rate limiting
+                    if not ticker_hist.empty:
+                        frames.append(self._format_history(ticker_hist, ticker, name, collection_time))
                     
                 except Exception as e:
                     logger.warning(f"⚠️ Erreur pour {ticker}: {str(e)}")
                     continue
             
-            df = pd.DataFrame(all_data)
+            df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
             
             if not df.empty:
-                filename = f"market_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-                filepath = os.path.join(self.data_path, "market", filename)
-                df.to_csv(filepath, index=False)
+                df = self._to_categorical(df)
+                self._save_dataframe(df, "market", "market_data", collection_time)
                 
                 logger.info(f"✅ Market: {len(df)} enregistrements collectés")
             
@@ -138,12 +191,33 @@ class LiquidityDataCollector:
             logger.error(f"❌ Erreur collection Market: {str(e)}")
             return pd.DataFrame()
     
+    def _format_history(self, hist: pd.DataFrame, ticker: str, name: str,
+                        collection_time: datetime) -> pd.DataFrame:
+        """Met en forme l'historique Yahoo Finance d'un ticker (sans boucle par ligne)"""
+        prices = hist.rename(columns=str.lower).reindex(
+            columns=['open', 'high', 'low', 'close', 'volume']
+        )
+        dates = pd.DatetimeIndex(hist.index).tz_localize(None).normalize()
+        
+        return prices.assign(
+            date=dates,
+            instrument=name,
+            ticker=ticker,
+            source='Yahoo_Finance',
+            collection_time=collection_time
+        ).reset_index(drop=True)[[
+            'date', 'instrument', 'ticker', 'open', 'high', 'low', 'close',
+            'volume', 'source', 'collection_time'
+        ]]
+    
     def collect_alpha_vantage_data(self, api_key: Optional[str] = None) -> pd.DataFrame:
         """Collecte via Alpha Vantage (optionnel)"""
         if not api_key:
             logger.info("ℹ️ Alpha Vantage ignoré (pas de clé API)")
             return pd.DataFrame()
         
+        collection_time = datetime.now()
+        
         try:
             url = "https://www.alphavantage.co/query"
             params = {
@@ -153,27 +227,23 @@ class LiquidityDataCollector:
             }
             
             logger.info("🔄 Collecte Alpha Vantage...")
-            response = requests.get(url, params=params, timeout=30)
+            response = self._session.get(url, params=params, timeout=30)
             
             if response.status_code == 200:
                 data = response.json()
                 
                 if 'data' in data:
-                    records = []
-                    for item in data['data'][:50]:
-                        records.append({
-                            'date': pd.to_datetime(item['date']),
-                            'rate_type': 'FED_FUNDS_RATE',
-                            'value': float(item['value']),
-                            'source': 'Alpha_Vantage',
-                            'collection_time': datetime.now()
-                        })
+                    items = data['data'][:50]
                     
-                    df = pd.DataFrame(records)
+                    df = self._to_categorical(pd.DataFrame({
+                        'date': pd.to_datetime([item['date'] for item in items]),
+                        'rate_type': 'FED_FUNDS_RATE',
+                        'value': [float(item['value']) for item in items],
+                        'source': 'Alpha_Vantage',
+                        'collection_time': collection_time
+                    }))
                     
-                    filename = f"alpha_vantage_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-                    filepath = os.path.join(self.data_path, "market", filename)
-                    df.to_csv(filepath, index=False)
+                    self._save_dataframe(df, "market", "alpha_vantage", collection_time)
                     
                     logger.info(f"✅ Alpha Vantage: {len(df)} enregistrements collectés")
                     return df
@@ -188,13 +258,27 @@ class LiquidityDataCollector:
         """Récupère les fichiers les plus récents de chaque source"""
         latest_files = {}
         
-        for source_dir in ['ecb', 'market']:
+        # Préfixe des fichiers de chaque source: market/ contient aussi les
+        # fichiers alpha_vantage_*, qui ne doivent pas remplacer Yahoo Finance
+        source_prefixes = {'ecb': 'ecb_rates_', 'market': 'market_data_'}
+        
+        for source_dir, prefix in source_prefixes.items():
             source_path = os.path.join(self.data_path, source_dir)
-            if os.path.exists(source_path):
-                files = [f for f in os.listdir(source_path) if f.endswith('.csv')]
-                if files:
-                    latest_file = max(files)
-                    latest_files[source_dir] = os.path.join(source_path, latest_file)
+            if not os.path.exists(source_path):
+                continue
+            
+            # Un seul parcours du dossier, fichier le plus récent par mtime
+            latest = None
+            with os.scandir(source_path) as entries:
+                for entry in entries:
+                    if (entry.name.startswith(prefix) and entry.name.endswith(('.parquet', '.csv'))
+                            and entry.is_file()):
+                        mtime = entry.stat().st_mtime_ns
+                        if latest is None or mtime > latest[0]:
+                            latest = (mtime, entry.path)
+            
+            if latest:
+                latest_files[source_dir] = latest[1]
         
         return latest_files
     
@@ -203,12 +287,21 @@ class LiquidityDataCollector:
         logger.info("🚀 Début de la collecte de données...")
         start_time = datetime.now()
         
-        results = {
-            'ecb_data': self.collect_ecb_rates(),
-            'market_data': self.collect_market_data(),
-            'alpha_vantage_data': self.collect_alpha_vantage_data(alpha_vantage_key)
+        tasks = {
+            'ecb_data': (self.collect_ecb_rates, ()),
+            'market_data': (self.collect_market_data, ()),
+            'alpha_vantage_data': (self.collect_alpha_vantage_data, (alpha_vantage_key,))
         }
         
+        # Les sources sont indépendantes: un thread par source, session HTTP
+        # partagée; la durée totale tend vers celle de la source la plus lente
+        with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+            futures = {
+                name: executor.submit(collect, *args)
+                for name, (collect, args) in tasks.items()
+            }
+            results = {name: future.result() for name, future in futures.items()}
+        
         # Log de synthèse
         total_records = sum(len(df) for df in results.values())
         duration = datetime.now() - start_time
@@ -228,8 +321,8 @@ class LiquidityDataCollector:
         # Sauvegarde du log
         log_file = os.path.join(self.data_path, "quality_logs", 
                                f"collection_log_{start_time.strftime('%Y%m%d_%H%M%S')}.json")
-        with open(log_file, 'w') as f:
-            json.dump(log_entry, f, indent=2)
+        with open(log_file, 'wb') as f:
+            f.write(orjson.dumps(log_entry, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
         
         logger.info(f"✅ Collection terminée: {total_records} enregistrements en {duration.total_seconds():.1f}s")
         
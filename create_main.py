@@ -51,7 +51,7 @@ def check_quality(args):
     for source, filepath in latest_files.items():
         try:
             import pandas as pd
-            df = pd.read_csv(filepath)
+            df = collector.load_file(filepath)
             data[source] = df
             print(f"✅ Chargé {source}: {len(df)} enregistrements")
         except Exception as e:
@@ -80,7 +80,7 @@ def detect_anomalies(args):
     for source, filepath in latest_files.items():
         try:
             import pandas as pd
-            df = pd.read_csv(filepath)
+            df = collector.load_file(filepath)
             data[source] = df
         except Exception as e:
             print(f"❌ Erreur chargement {source}: {str(e)}")
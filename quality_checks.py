@@ -2,7 +2,7 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 from typing import Dict, List, Any, Optional
-import json
+import orjson
 import os
 from pathlib import Path
 
@@ -13,7 +13,41 @@ class DataQualityChecker:
         self.quality_report_path = quality_report_path
         Path(quality_report_path).mkdir(parents=True, exist_ok=True)
     
-    def check_completeness(self, df: pd.DataFrame, required_columns: List[str]) -> Dict[str, Any]:
+    def _scan(self, df: pd.DataFrame, date_column: str = 'date',
+              subset_columns: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Calcule en un seul parcours les agrégats partagés par les contrôles"""
+        missing_mask = df.isna().to_numpy()
+        
+        latest_date = pd.NaT
+        if date_column in df.columns:
+            try:
+                latest_date = pd.to_datetime(df[date_column]).max()
+            except Exception:
+                pass
+        
+        return {
+            'date_column': date_column,
+            'subset_columns': subset_columns,
+            'missing_counts': pd.Series(missing_mask.sum(axis=0), index=df.columns),
+            'latest_date': latest_date,
+            'duplicate_count': self._count_duplicates(df, subset_columns)
+        }
+    
+    def _count_duplicates(self, df: pd.DataFrame,
+                          subset_columns: Optional[List[str]] = None) -> int:
+        """Compte les doublons via un hachage des lignes (sans masque booléen)"""
+        frame = df if subset_columns is None else df[subset_columns]
+        
+        # Colonnes objet: le hachage convertit en texte (1 et '1' confondus),
+        # on garde alors la comparaison exacte de duplicated()
+        if (frame.dtypes == object).any():
+            return int(frame.duplicated().sum())
+        
+        row_hashes = pd.util.hash_pandas_object(frame, index=False)
+        return len(row_hashes) - row_hashes.nunique()
+    
+    def check_completeness(self, df: pd.DataFrame, required_columns: List[str],
+                           scan: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Vérifie la complétude des données"""
         if df.empty:
             return {
@@ -25,17 +59,19 @@ class DataQualityChecker:
         
         missing_columns = [col for col in required_columns if col not in df.columns]
         
-        missing_values = {}
         total_values = len(df) * len(df.columns)
-        total_missing = 0
         
-        for column in df.columns:
-            missing_count = df[column].isnull().sum()
-            missing_values[column] = {
+        # Comptage des valeurs manquantes en une seule réduction
+        missing_counts = scan['missing_counts'] if scan else df.isnull().sum()
+        total_missing = int(missing_counts.sum())
+        
+        missing_values = {
+            column: {
                 'count': int(missing_count),
                 'percentage': float(missing_count / len(df) * 100)
             }
-            total_missing += missing_count
+            for column, missing_count in missing_counts.items()
+        }
         
         completeness_score = 1.0 - (total_missing / total_values)
         
@@ -47,7 +83,8 @@ class DataQualityChecker:
         }
     
     def check_freshness(self, df: pd.DataFrame, date_column: str = 'date', 
-                       max_age_hours: int = 24) -> Dict[str, Any]:
+                       max_age_hours: int = 24,
+                       scan: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Vérifie la fraîcheur des données"""
         if df.empty or date_column not in df.columns:
             return {
@@ -58,8 +95,11 @@ class DataQualityChecker:
             }
         
         try:
-            df[date_column] = pd.to_datetime(df[date_column])
-            latest_date = df[date_column].max()
+            # Agrégat partagé réutilisé seulement s'il porte sur la même colonne
+            if scan and scan['date_column'] == date_column:
+                latest_date = scan['latest_date']
+            else:
+                latest_date = pd.to_datetime(df[date_column]).max()
             current_time = datetime.now()
             
             if pd.isna(latest_date):
@@ -86,7 +126,8 @@ class DataQualityChecker:
             }
     
     def check_duplicates(self, df: pd.DataFrame, 
-                        subset_columns: Optional[List[str]] = None) -> Dict[str, Any]:
+                        subset_columns: Optional[List[str]] = None,
+                        scan: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Vérifie les doublons"""
         if df.empty:
             return {
@@ -95,15 +136,60 @@ class DataQualityChecker:
                 'has_duplicates': False
             }
         
-        duplicate_count = df.duplicated(subset=subset_columns).sum()
+        if scan and scan['subset_columns'] == subset_columns:
+            duplicate_count = scan['duplicate_count']
+        else:
+            duplicate_count = self._count_duplicates(df, subset_columns)
         duplicate_percentage = duplicate_count / len(df) * 100
         
         return {
             'duplicate_count': int(duplicate_count),
             'duplicate_percentage': float(duplicate_percentage),
-            'has_duplicates': bool(duplicate_count > 0)
+            'has_duplicates': duplicate_count != 0
         }
     
+    def _source_report(self, source_name: str, df: pd.DataFrame) -> Dict[str, Any]:
+        """Contrôle qualité d'une source"""
+        if df.empty:
+            source_report = {
+                'record_count': 0,
+                'completeness': self.check_completeness(df, []),
+                'freshness': self.check_freshness(df),
+                'duplicates': self.check_duplicates(df),
+                'quality_score': 0.0
+            }
+        else:
+            # Définir les colonnes requises selon le type de données
+            if 'ecb' in source_name.lower():
+                required_columns = ['date', 'rate_type', 'value']
+            elif 'market' in source_name.lower():
+                required_columns = ['date', 'instrument', 'close']
+            else:
+                required_columns = list(df.columns)
+            
+            # Un seul parcours du DataFrame pour les trois contrôles
+            scan = self._scan(df)
+            completeness = self.check_completeness(df, required_columns, scan=scan)
+            freshness = self.check_freshness(df, scan=scan)
+            duplicates = self.check_duplicates(df, scan=scan)
+            
+            # Calcul du score de qualité
+            quality_score = (
+                completeness['completeness_score'] * 0.4 +
+                freshness['freshness_score'] * 0.4 +
+                (1.0 - duplicates['duplicate_percentage'] / 100) * 0.2
+            )
+            
+            source_report = {
+                'record_count': len(df),
+                'completeness': completeness,
+                'freshness': freshness,
+                'duplicates': duplicates,
+                'quality_score': float(quality_score)
+            }
+        
+        return source_report
+    
     def generate_quality_report(self, data_dict: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
         """Génère un rapport de qualité complet"""
         timestamp = datetime.now()
@@ -116,42 +202,7 @@ class DataQualityChecker:
         source_scores = []
         
         for source_name, df in data_dict.items():
-            if df.empty:
-                source_report = {
-                    'record_count': 0,
-                    'completeness': self.check_completeness(df, []),
-                    'freshness': self.check_freshness(df),
-                    'duplicates': self.check_duplicates(df),
-                    'quality_score': 0.0
-                }
-            else:
-                # Définir les colonnes requises selon le type de données
-                if 'ecb' in source_name.lower():
-                    required_columns = ['date', 'rate_type', 'value']
-                elif 'market' in source_name.lower():
-                    required_columns = ['date', 'instrument', 'close']
-                else:
-                    required_columns = list(df.columns)
-                
-                completeness = self.check_completeness(df, required_columns)
-                freshness = self.check_freshness(df)
-                duplicates = self.check_duplicates(df)
-                
-                # Calcul du score de qualité
-                quality_score = (
-                    completeness['completeness_score'] * 0.4 +
-                    freshness['freshness_score'] * 0.4 +
-                    (1.0 - duplicates['duplicate_percentage'] / 100) * 0.2
-                )
-                
-                source_report = {
-                    'record_count': len(df),
-                    'completeness': completeness,
-                    'freshness': freshness,
-                    'duplicates': duplicates,
-                    'quality_score': float(quality_score)
-                }
-            
+            source_report = self._source_report(source_name, df)
             report['sources'][source_name] = source_report
             source_scores.append(source_report['quality_score'])
         
@@ -163,7 +214,7 @@ class DataQualityChecker:
         report_filename = f"quality_report_{timestamp.strftime('%Y%m%d_%H%M%S')}.json"
         report_path = os.path.join(self.quality_report_path, report_filename)
         
-        with open(report_path, 'w') as f:
-            json.dump(report, f, indent=2)
+        with open(report_path, 'wb') as f:
+            f.write(orjson.dumps(report, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
         
         return report
\ No newline at end of file
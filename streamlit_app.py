@@ -1,10 +1,10 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import json
+import numpy as np
+import orjson
 import os
+import heapq
+import warnings
 from datetime import datetime, timedelta
 import sys
 from pathlib import Path
@@ -12,9 +12,7 @@ from pathlib import Path
 # Ajouter le répertoire parent au path pour les imports
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
-from src.data_collection.api_collectors import LiquidityDataCollector
-from src.data_quality.quality_checks import DataQualityChecker
-from src.data_quality.anomaly_detection import AnomalyDetector
+from src.data_collection.api_collectors import LiquidityDataCollector, MARKET_TICKERS
 
 # Configuration de la page
 st.set_page_config(
@@ -24,8 +22,14 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Nombre maximal de points par courbe envoyés au navigateur
+MAX_PLOT_POINTS = 1000
+
+# Instruments affichés dans le graphique Treasury (calculé une fois, pas à chaque rendu)
+TREASURY_INSTRUMENTS = sorted(name for name in MARKET_TICKERS.values() if 'Treasury' in name)
+
 # CSS personnalisé
-st.markdown("""
+CUSTOM_CSS = """
 <style>
     .metric-card {
         background-color: #f0f2f6;
@@ -37,20 +41,53 @@ st.markdown("""
     .quality-warning { border-left-color: #ffd43b !important; }
     .quality-bad { border-left-color: #ff6b6b !important; }
 </style>
-""", unsafe_allow_html=True)
+"""
 
-@st.cache_data(ttl=300)  # Cache 5 minutes
-def load_data():
-    """Charge les données avec cache"""
-    collector = LiquidityDataCollector()
-    
-    # Charger les fichiers les plus récents
-    latest_files = collector.get_latest_files()
+st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
+
+@st.cache_resource
+def get_collector():
+    """Collecteur partagé entre les sessions (session HTTP réutilisée)"""
+    return LiquidityDataCollector()
+
+@st.cache_resource
+def get_quality_checker():
+    """Vérificateur de qualité partagé entre les sessions"""
+    # Import différé: module chargé seulement par la page qui l'utilise
+    from src.data_quality.quality_checks import DataQualityChecker
+    return DataQualityChecker()
+
+@st.cache_resource
+def get_detector():
+    """Détecteur d'anomalies partagé entre les sessions"""
+    from src.data_quality.anomaly_detection import AnomalyDetector
+    return AnomalyDetector()
+
+def _stat(filepath):
+    """Signature d'un fichier (chemin, mtime, taille) utilisée comme clé de cache"""
+    stat = os.stat(filepath)
+    return filepath, stat.st_mtime_ns, stat.st_size
+
+@st.cache_data(ttl=None, show_spinner=False, max_entries=64)
+def _read_one(filepath, mtime, size):
+    """Lit un fichier de données (mtime et taille ne servent qu'à la clé de cache)"""
+    return get_collector().load_file(filepath)
+
+def _latest_signatures():
+    """Signatures (source, chemin, mtime, taille) des fichiers les plus récents"""
+    collector = get_collector()
+    return tuple(
+        (source,) + _stat(filepath)
+        for source, filepath in collector.get_latest_files().items()
+    )
+
+def _load_sources(signatures):
+    """Charge les sources décrites par leurs signatures de fichier"""
     data = {}
     
-    for source, filepath in latest_files.items():
+    for source, filepath, mtime, size in signatures:
         try:
-            df = pd.read_csv(filepath)
+            df = _read_one(filepath, mtime, size)
             data[source] = df
         except Exception as e:
             st.error(f"Erreur chargement {source}: {str(e)}")
@@ -58,24 +95,112 @@ def load_data():
     
     return data
 
+def load_data():
+    """Charge les données, chaque fichier inchangé étant servi depuis le cache"""
+    return _load_sources(_latest_signatures())
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _cached_quality_report(signatures):
+    """Rapport qualité mémorisé tant que les fichiers sources sont inchangés"""
+    return get_quality_checker().generate_quality_report(_load_sources(signatures))
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _cached_anomaly_report(signatures):
+    """Rapport d'anomalies mémorisé tant que les fichiers sources sont inchangés"""
+    return get_detector().generate_anomaly_report(_load_sources(signatures))
+
 @st.cache_data(ttl=300)
 def load_quality_reports():
-    """Charge les rapports de qualité"""
+    """Charge les rapports de qualité (du plus récent au plus ancien)"""
     reports_path = "./data/quality_reports"
     if not os.path.exists(reports_path):
         return []
     
+    # Tri sur la date de modification (stat portée par les DirEntry): pas
+    # besoin de parser pour ordonner
+    with os.scandir(reports_path) as entries:
+        paths = [
+            entry.path
+            for entry in sorted(
+                (entry for entry in entries if entry.name.endswith('.json') and entry.is_file()),
+                key=lambda entry: entry.stat().st_mtime,
+                reverse=True
+            )
+        ]
+    
     reports = []
-    for filename in os.listdir(reports_path):
-        if filename.endswith('.json'):
-            try:
-                with open(os.path.join(reports_path, filename), 'r') as f:
-                    report = json.load(f)
-                    reports.append(report)
-            except Exception:
-                continue
-    
-    return sorted(reports, key=lambda x: x['timestamp'], reverse=True)
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                reports.append(orjson.loads(f.read()))
+        except Exception:
+            continue
+    
+    return reports
+
+def _lttb(x, y, n_out=MAX_PLOT_POINTS):
+    """Sous-échantillonnage LTTB (Largest-Triangle-Three-Buckets) d'une série"""
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=np.float64)
+    if len(x) <= n_out:
+        return x, y
+    
+    valid = ~np.isnan(y)
+    x, y = x[valid], y[valid]
+    n = len(x)
+    if n <= n_out:
+        return x, y
+    
+    x_num = x.astype('datetime64[ns]').view('i8') if np.issubdtype(x.dtype, np.datetime64) else x
+    x_num = x_num.astype(np.float64)
+    
+    # Premier et dernier points conservés, n_out - 2 paquets entre les deux
+    bounds = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    
+    a = 0
+    for i in range(n_out - 2):
+        start, end = bounds[i], bounds[i + 1]
+        next_end = bounds[i + 2] if i + 2 < len(bounds) else n
+        avg_x = x_num[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        
+        # Point du paquet formant le plus grand triangle avec a et la moyenne suivante
+        areas = np.abs(
+            (x_num[a] - avg_x) * (y[start:end] - y[a])
+            - (x_num[a] - x_num[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(areas))
+        selected[i + 1] = a
+    
+    return x[selected], y[selected]
+
+def _source_stats(df):
+    """Complétude, fraîcheur et nombre d'anomalies d'une source en un passage"""
+    # Moyenne directe du masque booléen: une seule réduction
+    completeness = 1.0 - df.isna().to_numpy().mean() if df.size else 0.0
+    
+    freshness = None
+    if 'collection_time' in df.columns:
+        latest_time = df['collection_time'].max()
+        hours_old = (datetime.now() - latest_time).total_seconds() / 3600
+        freshness = max(0, 1 - hours_old / 24)  # Score sur 24h
+    
+    # Matrice numérique unique: une passe NumPy pour toutes les colonnes
+    anomaly_count = 0
+    values = df.select_dtypes(include=['float64', 'int64']).to_numpy(dtype=np.float64, copy=False)
+    if values.size > 0:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            mean_vals = np.nanmean(values, axis=0)
+            std_vals = np.nanstd(values, axis=0, ddof=1)
+        
+        with np.errstate(invalid='ignore'):
+            z_scores = np.abs((values - mean_vals) / np.where(std_vals == 0, 1, std_vals))
+            anomaly_count = int(np.count_nonzero(z_scores > 3))
+    
+    return completeness, freshness, anomaly_count
 
 def display_kpi_cards(data):
     """Affiche les KPI principaux"""
@@ -84,6 +209,12 @@ def display_kpi_cards(data):
     total_records = sum(len(df) for df in data.values())
     active_sources = sum(1 for df in data.values() if not df.empty)
     
+    # Un seul parcours des sources pour les trois indicateurs
+    stats = [_source_stats(df) for df in data.values() if not df.empty]
+    completeness_scores = [completeness for completeness, _, _ in stats]
+    freshness_scores = [freshness for _, freshness, _ in stats if freshness is not None]
+    total_anomalies = sum(anomaly_count for _, _, anomaly_count in stats)
+    
     with col1:
         st.metric(
             label="📊 Total Records",
@@ -91,15 +222,6 @@ def display_kpi_cards(data):
             delta=f"{active_sources} sources actives"
         )
     
-    # Calcul de la fraîcheur moyenne
-    freshness_scores = []
-    for source, df in data.items():
-        if not df.empty and 'collection_time' in df.columns:
-            latest_time = pd.to_datetime(df['collection_time']).max()
-            hours_old = (datetime.now() - latest_time).total_seconds() / 3600
-            freshness = max(0, 1 - hours_old / 24)  # Score sur 24h
-            freshness_scores.append(freshness)
-    
     avg_freshness = sum(freshness_scores) / len(freshness_scores) if freshness_scores else 0
     
     with col2:
@@ -110,13 +232,6 @@ def display_kpi_cards(data):
         )
     
     with col3:
-        # Calcul du taux de complétude
-        completeness_scores = []
-        for df in data.values():
-            if not df.empty:
-                completeness = 1 - df.isnull().sum().sum() / (len(df) * len(df.columns))
-                completeness_scores.append(completeness)
-        
         avg_completeness = sum(completeness_scores) / len(completeness_scores) if completeness_scores else 0
         
         st.metric(
@@ -126,26 +241,53 @@ def display_kpi_cards(data):
         )
     
     with col4:
-        # Calcul des anomalies
-        total_anomalies = 0
-        for df in data.values():
-            if not df.empty:
-                numeric_cols = df.select_dtypes(include=['float64', 'int64']).columns
-                for col in numeric_cols:
-                    if len(df[col].dropna()) > 0:
-                        z_scores = abs((df[col] - df[col].mean()) / df[col].std())
-                        total_anomalies += (z_scores > 3).sum()
-        
         st.metric(
             label="⚠️ Anomalies",
             value=total_anomalies,
             delta="Valeurs aberrantes"
         )
 
+def _select_window(data):
+    """Curseur de période commun aux courbes de la vue d'ensemble"""
+    bounds = [
+        (df['date'].min(), df['date'].max())
+        for df in data.values()
+        if not df.empty and 'date' in df.columns and pd.api.types.is_datetime64_any_dtype(df['date'])
+    ]
+    if not bounds:
+        return None
+    
+    start = min(b[0] for b in bounds)
+    end = max(b[1] for b in bounds)
+    if pd.isna(start) or pd.isna(end) or start >= end:
+        return None
+    
+    return st.slider(
+        "Période affichée",
+        min_value=start.to_pydatetime(),
+        max_value=end.to_pydatetime(),
+        value=(start.to_pydatetime(), end.to_pydatetime()),
+        format="DD/MM/YYYY"
+    )
+
+def _in_window(df, window):
+    """Restreint un DataFrame à la période sélectionnée"""
+    if window is None or not pd.api.types.is_datetime64_any_dtype(df['date']):
+        return df
+    return df[(df['date'] >= window[0]) & (df['date'] <= window[1])]
+
 def display_data_overview(data):
     """Affiche la vue d'ensemble des données"""
+    # Plotly n'est importé que pour la page Overview
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+    
     st.subheader("📊 Vue d'ensemble des données")
     
+    # Fenêtre affichée: le sous-échantillonnage ne porte que sur la période
+    # choisie, ce qui rend le détail complet quand on la réduit
+    window = _select_window(data)
+    
     # Graphique temporel
     fig = make_subplots(
         rows=2, cols=2,
@@ -163,14 +305,14 @@ def display_data_overview(data):
         color = colors[i % len(colors)]
         
         if source == 'ecb' and 'value' in df.columns:
-            df_plot = df.copy()
-            df_plot['date'] = pd.to_datetime(df_plot['date'])
-            df_plot = df_plot.sort_values('date')
+            # Les dates arrivent déjà typées du chargement (Parquet/pyarrow)
+            df_plot = _in_window(df, window).sort_values('date')
+            x, y = _lttb(df_plot['date'].to_numpy(), df_plot['value'].to_numpy(dtype=np.float64, na_value=np.nan))
             
             fig.add_trace(
-                go.Scatter(
-                    x=df_plot['date'],
-                    y=df_plot['value'],
+                go.Scattergl(
+                    x=x,
+                    y=y,
                     name='EURIBOR 1M',
                     line=dict(color=color),
                     mode='lines+markers'
@@ -179,18 +321,18 @@ def display_data_overview(data):
             )
         
         elif source == 'market' and 'close' in df.columns:
-            df_plot = df.copy()
-            df_plot['date'] = pd.to_datetime(df_plot['date'])
+            df_plot = _in_window(df, window)
             
-            # Treasury rates
-            treasury_data = df_plot[df_plot['instrument'].str.contains('Treasury', na=False)]
+            # Treasury rates: appartenance à un ensemble précalculé (sur les catégories)
+            treasury_data = df_plot[df_plot['instrument'].isin(TREASURY_INSTRUMENTS)]
             if not treasury_data.empty:
                 for instrument in treasury_data['instrument'].unique():
                     inst_data = treasury_data[treasury_data['instrument'] == instrument].sort_values('date')
+                    x, y = _lttb(inst_data['date'].to_numpy(), inst_data['close'].to_numpy(dtype=np.float64, na_value=np.nan))
                     fig.add_trace(
-                        go.Scatter(
-                            x=inst_data['date'],
-                            y=inst_data['close'],
+                        go.Scattergl(
+                            x=x,
+                            y=y,
                             name=instrument,
                             line=dict(color=color),
                             mode='lines'
@@ -202,10 +344,11 @@ def display_data_overview(data):
             eur_usd_data = df_plot[df_plot['instrument'] == 'EUR_USD_Rate']
             if not eur_usd_data.empty:
                 eur_usd_data = eur_usd_data.sort_values('date')
+                x, y = _lttb(eur_usd_data['date'].to_numpy(), eur_usd_data['close'].to_numpy(dtype=np.float64, na_value=np.nan))
                 fig.add_trace(
-                    go.Scatter(
-                        x=eur_usd_data['date'],
-                        y=eur_usd_data['close'],
+                    go.Scattergl(
+                        x=x,
+                        y=y,
                         name='EUR/USD',
                         line=dict(color='#2ca02c'),
                         mode='lines'
@@ -214,44 +357,64 @@ def display_data_overview(data):
                 )
     
     # Volume par jour
-    daily_counts = {}
+    day_arrays = []
     for source, df in data.items():
         if not df.empty and 'date' in df.columns:
-            daily_count = df.groupby(pd.to_datetime(df['date']).dt.date).size()
-            for date, count in daily_count.items():
-                daily_counts[date] = daily_counts.get(date, 0) + count
+            dates = df['date']
+            if not pd.api.types.is_datetime64_any_dtype(dates):
+                dates = pd.to_datetime(dates, errors='coerce')
+            
+            # Jours entiers (datetime64[D]) plutôt que des objets date
+            days = dates.to_numpy(dtype='datetime64[D]')
+            day_arrays.append(days[~np.isnat(days)])
     
-    if daily_counts:
-        dates = list(daily_counts.keys())
-        counts = list(daily_counts.values())
+    # Un seul comptage sur toutes les sources (tableaux NumPy passés à go.Bar)
+    if day_arrays:
+        days, day_counts = np.unique(np.concatenate(day_arrays), return_counts=True)
         
         fig.add_trace(
             go.Bar(
-                x=dates,
-                y=counts,
+                x=days,
+                y=day_counts,
                 name='Records/jour',
                 marker_color='#9467bd'
             ),
             row=2, col=2
         )
     
-    fig.update_layout(height=600, showlegend=True)
+    # uirevision: zoom et sélection conservés d'un rendu à l'autre
+    fig.update_layout(height=600, showlegend=True, uirevision='overview')
     st.plotly_chart(fig, use_container_width=True)
 
+def _quality_card_html(source, source_report):
+    """Fragment HTML de la carte qualité d'une source"""
+    score = source_report['quality_score']
+    score_color = "#51cf66" if score > 0.8 else "#ffd43b" if score > 0.6 else "#ff6b6b"
+    
+    return (
+        f'<div class="metric-card" style="border-left-color: {score_color}">'
+        f"<h4>{source.upper()}</h4>"
+        f"<p><strong>Score:</strong> {score:.1%}</p>"
+        f"<p><strong>Records:</strong> {source_report['record_count']:,}</p>"
+        f"<p><strong>Complétude:</strong> {source_report['completeness']['completeness_score']:.1%}</p>"
+        f"<p><strong>Fraîcheur:</strong> {source_report['freshness']['freshness_score']:.1%}</p>"
+        "</div>"
+    )
+
 def display_quality_dashboard():
     """Affiche le dashboard de qualité"""
     st.subheader("🔍 Dashboard Qualité")
     
     # Charger les données
-    data = load_data()
+    signatures = _latest_signatures()
+    data = _load_sources(signatures)
     
-    if not any(data.values()):
+    if all(df.empty for df in data.values()):
         st.warning("Aucune donnée disponible. Lancez une collecte d'abord.")
         return
     
-    # Générer rapport de qualité en temps réel
-    quality_checker = DataQualityChecker()
-    quality_report = quality_checker.generate_quality_report(data)
+    # Rapport de qualité recalculé seulement si les fichiers ont changé
+    quality_report = _cached_quality_report(signatures)
     
     # Score global
     overall_score = quality_report['overall_score']
@@ -263,63 +426,71 @@ def display_quality_dashboard():
         delta=f"Basé sur {len(data)} sources"
     )
     
-    # Détails par source
-    cols = st.columns(len(data))
-    for i, (source, source_report) in enumerate(quality_report['sources'].items()):
-        with cols[i]:
-            score = source_report['quality_score']
-            score_color = "#51cf66" if score > 0.8 else "#ffd43b" if score > 0.6 else "#ff6b6b"
-            
-            st.markdown(f"""
-            <div class="metric-card" style="border-left-color: {score_color}">
-                <h4>{source.upper()}</h4>
-                <p><strong>Score:</strong> {score*100:.1f}%</p>
-                <p><strong>Records:</strong> {source_report['record_count']:,}</p>
-                <p><strong>Complétude:</strong> {source_report['completeness']['completeness_score']*100:.1f}%</p>
-                <p><strong>Fraîcheur:</strong> {source_report['freshness']['freshness_score']*100:.1f}%</p>
-            </div>
-            """, unsafe_allow_html=True)
+    # Détails par source: toutes les cartes dans une seule grille HTML
+    cards = "".join(
+        _quality_card_html(source, source_report)
+        for source, source_report in quality_report['sources'].items()
+    )
+    st.markdown(
+        f"<div style='display:grid;grid-template-columns:repeat({max(len(quality_report['sources']), 1)},1fr);gap:1rem'>"
+        f"{cards}</div>",
+        unsafe_allow_html=True
+    )
 
 def display_anomaly_detection():
     """Affiche la détection d'anomalies"""
     st.subheader("🚨 Détection d'Anomalies")
     
-    data = load_data()
+    signatures = _latest_signatures()
+    data = _load_sources(signatures)
     
-    if not any(data.values()):
+    if all(df.empty for df in data.values()):
         st.warning("Aucune donnée disponible.")
         return
     
-    detector = AnomalyDetector()
-    anomaly_report = detector.generate_anomaly_report(data)
+    # Rapport d'anomalies recalculé seulement si les fichiers ont changé
+    anomaly_report = _cached_anomaly_report(signatures)
+    
+    # Aplatissement du rapport: un tableau par catégorie plutôt qu'un widget par anomalie
+    sources = anomaly_report['sources']
+    outlier_rows = [
+        (source.upper(), column, stats['count'], stats['percentage'])
+        for source, anomalies in sources.items()
+        for column, stats in anomalies['statistical_outliers'].items()
+        if stats['count'] > 0
+    ]
+    temporal_rows = [
+        (
+            source.upper(),
+            len(anomalies['temporal_anomalies'].get('gaps', [])),
+            len(anomalies['temporal_anomalies'].get('sudden_changes', []))
+        )
+        for source, anomalies in sources.items()
+    ]
+    temporal_rows = [row for row in temporal_rows if row[1] > 0 or row[2] > 0]
     
-    for source, anomalies in anomaly_report['sources'].items():
-        st.write(f"### {source.upper()}")
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.write("**Valeurs aberrantes statistiques:**")
-            outliers = anomalies['statistical_outliers']
-            if outliers:
-                for column, stats in outliers.items():
-                    if stats['count'] > 0:
-                        st.warning(f"{column}: {stats['count']} anomalies ({stats['percentage']:.1f}%)")
-            else:
-                st.success("Aucune anomalie statistique détectée")
-        
-        with col2:
-            st.write("**Anomalies temporelles:**")
-            temporal = anomalies['temporal_anomalies']
-            gap_count = len(temporal.get('gaps', []))
-            change_count = len(temporal.get('sudden_changes', []))
-            
-            if gap_count > 0:
-                st.warning(f"{gap_count} gaps temporels détectés")
-            if change_count > 0:
-                st.warning(f"{change_count} variations brutales détectées")
-            if gap_count == 0 and change_count == 0:
-                st.success("Aucune anomalie temporelle")
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.write("**Valeurs aberrantes statistiques:**")
+        if outlier_rows:
+            st.dataframe(
+                pd.DataFrame(outlier_rows, columns=['Source', 'Colonne', 'Anomalies', '%']),
+                hide_index=True,
+                column_config={'%': st.column_config.NumberColumn(format="%.1f")}
+            )
+        else:
+            st.success("Aucune anomalie statistique détectée")
+    
+    with col2:
+        st.write("**Anomalies temporelles:**")
+        if temporal_rows:
+            st.dataframe(
+                pd.DataFrame(temporal_rows, columns=['Source', 'Gaps temporels', 'Variations brutales']),
+                hide_index=True
+            )
+        else:
+            st.success("Aucune anomalie temporelle")
 
 def main():
     """Application principale"""
@@ -359,7 +530,7 @@ def main():
         with col1:
             if st.button("🚀 Lancer la collecte", type="primary"):
                 with st.spinner("Collecte en cours..."):
-                    collector = LiquidityDataCollector()
+                    collector = get_collector()
                     results = collector.run_full_collection()
                     
                     st.success("Collecte terminée !")
@@ -370,9 +541,15 @@ def main():
             st.write("**Dernières collectes:**")
             logs_path = "./data/raw/quality_logs"
             if os.path.exists(logs_path):
-                log_files = [f for f in os.listdir(logs_path) if f.endswith('.json')]
-                for log_file in sorted(log_files, reverse=True)[:5]:
-                    st.write(f"📄 {log_file}")
+                # Seules les 5 plus récentes sont affichées: sélection partielle
+                with os.scandir(logs_path) as entries:
+                    latest_logs = heapq.nlargest(
+                        5,
+                        (entry for entry in entries if entry.name.endswith('.json')),
+                        key=lambda entry: entry.stat().st_mtime
+                    )
+                for log_file in latest_logs:
+                    st.write(f"📄 {log_file.name}")
     
     # Footer
     st.sidebar.markdown("---")
@@ -1,6 +1,8 @@
 import unittest
 import pandas as pd
 import sys
+import os
+import tempfile
 from pathlib import Path
 
 # Ajouter le répertoire parent au path
@@ -36,5 +38,22 @@ class TestLiquidityDataCollector(unittest.TestCase):
             for col in required_columns:
                 self.assertIn(col, df.columns, f"Colonne manquante: {col}")
 
+    def test_get_latest_files(self):
+        """Test de sélection du fichier le plus récent (mtime, par préfixe de source)"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            collector = LiquidityDataCollector(data_path=tmp_dir)
+            market_path = os.path.join(tmp_dir, "market")
+            older = os.path.join(market_path, "market_data_20990101_000000.csv")
+            newer = os.path.join(market_path, "market_data_20000101_000000.parquet")
+            alpha = os.path.join(market_path, "alpha_vantage_20000101_000000.parquet")
+            
+            for filepath, mtime in [(older, 1_000_000), (newer, 2_000_000), (alpha, 3_000_000)]:
+                Path(filepath).touch()
+                os.utime(filepath, (mtime, mtime))
+            
+            latest_files = collector.get_latest_files()
+            self.assertEqual(latest_files['market'], newer)
+            self.assertNotIn('ecb', latest_files)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
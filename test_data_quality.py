@@ -0,0 +1,169 @@
+import unittest
+import warnings
+import tempfile
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire parent au path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.data_quality.anomaly_detection import AnomalyDetector
+from src.data_quality.quality_checks import DataQualityChecker
+
+class TestAnomalyDetector(unittest.TestCase):
+    """Tests hors ligne du détecteur d'anomalies (données synthétiques)"""
+    
+    def setUp(self):
+        """Setup avant chaque test"""
+        self.detector = AnomalyDetector()
+    
+    def test_statistical_outliers(self):
+        """Z-scores par position, colonnes vides ou constantes"""
+        df = pd.DataFrame({
+            'value': [0.0] * 20 + [100.0, np.nan],
+            'empty': [np.nan] * 22,
+            'constant': [5.0] * 22
+        }, index=range(100, 122))
+        
+        outliers = self.detector.detect_statistical_outliers(df, ['value', 'empty', 'constant'])
+        
+        # Colonne entièrement vide: ignorée
+        self.assertNotIn('empty', outliers)
+        
+        # Colonne constante: écart-type nul, aucune anomalie
+        self.assertEqual(outliers['constant']['count'], 0)
+        
+        valid = df['value'].dropna()
+        expected_z = abs((100.0 - valid.mean()) / valid.std())
+        self.assertEqual(outliers['value']['count'], 1)
+        self.assertAlmostEqual(outliers['value']['percentage'], 1 / 21 * 100)
+        self.assertEqual(outliers['value']['outlier_values'], [100.0])
+        self.assertAlmostEqual(outliers['value']['z_scores'][0], expected_z)
+        self.assertFalse(outliers['value']['truncated'])
+    
+    def test_temporal_anomalies_unsorted(self):
+        """Gaps et variations brutales calculés après tri, index positionnels"""
+        dates = list(pd.date_range('2024-01-01', periods=5)) + list(pd.date_range('2024-01-21', periods=5))
+        values = [1.0] * 9 + [10.0]
+        order = [7, 2, 9, 0, 5, 3, 8, 1, 6, 4]
+        df = pd.DataFrame(
+            {'date': [dates[i] for i in order], 'value': [values[i] for i in order]},
+            index=[f"row{i}" for i in order]
+        )
+        
+        anomalies = self.detector.detect_temporal_anomalies(df)
+        
+        self.assertEqual(anomalies['gaps'], [{
+            'index': 5,
+            'gap_duration': '16 days 00:00:00',
+            'date_before': '2024-01-05T00:00:00',
+            'date_after': '2024-01-21T00:00:00'
+        }])
+        self.assertEqual(anomalies['sudden_changes'], [{
+            'index': 9,
+            'percentage_change': 900.0,
+            'value_before': 1.0,
+            'value_after': 10.0
+        }])
+    
+    def test_temporal_anomalies_zero_value(self):
+        """Une valeur nulle (variations infinies) ne lève pas d'avertissement"""
+        df = pd.DataFrame({
+            'date': pd.date_range('2024-01-01', periods=11),
+            'value': [0.0, 1.0, 0.0] + [1.0] * 8
+        })
+        
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            anomalies = self.detector.detect_temporal_anomalies(df)
+        
+        self.assertEqual([w for w in caught if issubclass(w.category, RuntimeWarning)], [])
+        self.assertEqual(anomalies, {'gaps': [], 'sudden_changes': []})
+    
+    def test_business_rule_violations(self):
+        """Règles de plage et de non-nullité, ordre de déclaration conservé"""
+        df = pd.DataFrame({
+            'value': [-1.0, 5.0, 150.0, np.nan],
+            'close': [1.0, np.nan, np.nan, 2.0],
+            'date': pd.to_datetime(['2023-12-31', '2024-01-15', '2024-02-01', None])
+        })
+        rules = {
+            'price_not_null': {'column': 'close', 'type': 'not_null'},
+            'missing_column': {'column': 'volume', 'type': 'not_null'},
+            'rate_positive': {'column': 'value', 'type': 'range', 'min': 0, 'max': 100},
+            'date_in_january': {
+                'column': 'date',
+                'type': 'range',
+                'min': pd.Timestamp('2024-01-01'),
+                'max': pd.Timestamp('2024-01-31')
+            },
+            'bad_bound': {'column': 'value', 'type': 'range', 'min': 'low', 'max': 100}
+        }
+        
+        violations = self.detector.detect_business_rule_violations(df, rules)
+        
+        self.assertEqual(
+            list(violations), ['price_not_null', 'rate_positive', 'date_in_january', 'bad_bound']
+        )
+        self.assertEqual(violations['price_not_null'], {
+            'type': 'null_violation', 'count': 2, 'percentage': 50.0
+        })
+        self.assertEqual(violations['rate_positive'], {
+            'type': 'range_violation', 'count': 2, 'percentage': 50.0
+        })
+        
+        # Bornes datetime: comparaison pandas hors de la matrice float64
+        self.assertEqual(violations['date_in_january'], {
+            'type': 'range_violation', 'count': 2, 'percentage': 50.0
+        })
+        
+        # Borne invalide: erreur isolée sur la règle concernée
+        self.assertEqual(violations['bad_bound']['type'], 'error')
+
+class TestDataQualityChecker(unittest.TestCase):
+    """Tests hors ligne du vérificateur de qualité (données synthétiques)"""
+    
+    def setUp(self):
+        """Setup avant chaque test"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.checker = DataQualityChecker(quality_report_path=self.tmp_dir.name)
+        self.df = pd.DataFrame({
+            'a': [1, 1, 1, 2],
+            'b': [1, 1, 2, 2],
+            'c': [np.nan, np.nan, 1.0, 1.0]
+        })
+    
+    def tearDown(self):
+        """Nettoyage après chaque test"""
+        self.tmp_dir.cleanup()
+    
+    def test_duplicates(self):
+        """Doublons sur toutes les colonnes et sur un sous-ensemble"""
+        full = self.checker.check_duplicates(self.df)
+        subset = self.checker.check_duplicates(self.df, subset_columns=['a'])
+        
+        self.assertEqual(full['duplicate_count'], int(self.df.duplicated().sum()))
+        self.assertEqual(full['duplicate_count'], 1)
+        self.assertEqual(subset['duplicate_count'], int(self.df.duplicated(subset=['a']).sum()))
+        self.assertEqual(subset['duplicate_count'], 2)
+        self.assertTrue(subset['has_duplicates'])
+        
+        # Colonne objet mixte: 1 et '1' (None et NaN) restent distincts
+        mixed = pd.DataFrame({'a': pd.Series([1, '1', None, np.nan], dtype=object)})
+        self.assertEqual(
+            self.checker.check_duplicates(mixed)['duplicate_count'], int(mixed.duplicated().sum())
+        )
+    
+    def test_scan_parameters(self):
+        """Un scan calculé sans sous-ensemble n'est pas réutilisé avec un sous-ensemble"""
+        scan = self.checker._scan(self.df)
+        
+        self.assertEqual(self.checker.check_duplicates(self.df, scan=scan)['duplicate_count'], 1)
+        self.assertEqual(
+            self.checker.check_duplicates(self.df, subset_columns=['a'], scan=scan)['duplicate_count'], 2
+        )
+
+if __name__ == '__main__':
+    unittest.main()